@@ -18,6 +18,7 @@ import (
 	"github.com/joho/godotenv"
 	"go.uber.org/zap"
 
+	"winsonin/internal/crypto"
 	"winsonin/internal/db"
 	"winsonin/internal/handlers"
 	mw "winsonin/internal/middleware"
@@ -65,20 +66,22 @@ func main() {
 		}
 	}
 
-	encryptionKey := os.Getenv("ENCRYPTION_KEY")
-	if encryptionKey == "" {
+	encryptionKeyEnv := os.Getenv("ENCRYPTION_KEY")
+	if encryptionKeyEnv == "" {
 		logger.Fatal("ENCRYPTION_KEY is required (must be 32 bytes)")
 	}
-	if len(encryptionKey) != 32 {
-		logger.Fatal("ENCRYPTION_KEY must be exactly 32 bytes")
+	encryptionKey, err := crypto.ParseKey(encryptionKeyEnv)
+	if err != nil {
+		logger.Fatal("invalid ENCRYPTION_KEY", zap.Error(err))
 	}
 
-	blindIndexKey := os.Getenv("BLIND_INDEX_KEY")
-	if blindIndexKey == "" {
+	blindIndexKeyEnv := os.Getenv("BLIND_INDEX_KEY")
+	if blindIndexKeyEnv == "" {
 		logger.Fatal("BLIND_INDEX_KEY is required (must be 32 bytes)")
 	}
-	if len(blindIndexKey) != 32 {
-		logger.Fatal("BLIND_INDEX_KEY must be exactly 32 bytes")
+	blindIndexKey, err := crypto.ParseKey(blindIndexKeyEnv)
+	if err != nil {
+		logger.Fatal("invalid BLIND_INDEX_KEY", zap.Error(err))
 	}
 
 	port := mustGetenv("PORT", "8080")
@@ -101,7 +104,7 @@ func main() {
 	}
 
 	// Initialize encryption service
-	encSvc, err := services.NewEncryptionService([]byte(encryptionKey), []byte(blindIndexKey))
+	encSvc, err := services.NewEncryptionService(encryptionKey, blindIndexKey)
 	if err != nil {
 		logger.Fatal("failed to initialize encryption service", zap.Error(err))
 	}
@@ -17,6 +17,27 @@ type EncryptionService struct {
 	blindIndexKey []byte // Separate key for HMAC blind indexing
 }
 
+// ParseKey converts a key from the environment into raw key bytes.
+// Keys generated by scripts/generate_keys.py are base64-encoded 32 random bytes;
+// legacy keys are 32-character strings whose bytes are used as-is.
+func ParseKey(value string) ([]byte, error) {
+	if len(value) == 32 {
+		return []byte(value), nil
+	}
+
+	key, err := base64.URLEncoding.DecodeString(value)
+	if err != nil {
+		key, err = base64.StdEncoding.DecodeString(value)
+		if err != nil {
+			return nil, errors.New("key must be 32 characters or base64-encoded 32 bytes")
+		}
+	}
+	if len(key) != 32 {
+		return nil, errors.New("key must decode to exactly 32 bytes")
+	}
+	return key, nil
+}
+
 // NewEncryptionService creates a new encryption service
 // encryptionKey should be 32 bytes for AES-256
 // blindIndexKey should be 32 bytes for HMAC-SHA256
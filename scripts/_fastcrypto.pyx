@@ -0,0 +1,130 @@
+# cython: language_level=3
+# distutils: libraries = crypto
+"""
+Optional native accelerator for batch AES-256-GCM decryption.
+
+Decrypts base64(nonce + ciphertext + tag) values, the format produced by the
+Go app and scripts/migrate_to_encryption.py, in a single C loop over OpenSSL
+EVP: the key schedule is set up once per batch and base64 decoding happens
+inline with EVP_DecodeBlock.
+
+Build (requires Cython and the OpenSSL development headers):
+    pip install cython
+    cythonize -i scripts/_fastcrypto.pyx
+
+decrypt_validation.py picks the built module up automatically when it is
+importable and falls back to the cryptography package otherwise.
+"""
+
+from libc.stdlib cimport malloc, free
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_GET_SIZE
+from cpython.unicode cimport PyUnicode_DecodeUTF8
+
+cdef extern from "Python.h":
+    const char *PyUnicode_AsUTF8AndSize(object unicode, Py_ssize_t *size) except NULL
+
+cdef extern from "openssl/evp.h":
+    ctypedef struct EVP_CIPHER_CTX:
+        pass
+    ctypedef struct EVP_CIPHER:
+        pass
+    ctypedef struct ENGINE:
+        pass
+
+    int EVP_CTRL_GCM_SET_IVLEN
+    int EVP_CTRL_GCM_SET_TAG
+
+    EVP_CIPHER_CTX *EVP_CIPHER_CTX_new()
+    void EVP_CIPHER_CTX_free(EVP_CIPHER_CTX *ctx)
+    const EVP_CIPHER *EVP_aes_256_gcm()
+    int EVP_CIPHER_CTX_ctrl(EVP_CIPHER_CTX *ctx, int type, int arg, void *ptr)
+    int EVP_DecryptInit_ex(EVP_CIPHER_CTX *ctx, const EVP_CIPHER *cipher, ENGINE *impl,
+                           const unsigned char *key, const unsigned char *iv)
+    int EVP_DecryptUpdate(EVP_CIPHER_CTX *ctx, unsigned char *out, int *outl,
+                          const unsigned char *in_, int inl)
+    int EVP_DecryptFinal_ex(EVP_CIPHER_CTX *ctx, unsigned char *outm, int *outl)
+    int EVP_DecodeBlock(unsigned char *t, const unsigned char *f, int n)
+
+cdef enum:
+    NONCE_SIZE = 12
+    TAG_SIZE = 16
+
+
+def decrypt_batch(bytes key, list ciphertexts):
+    """Decrypt a list of base64 ciphertexts (str or ASCII bytes) with AES-256-GCM.
+
+    Empty values decrypt to "". Raises ValueError if any item is malformed or
+    fails authentication.
+    """
+    if len(key) != 32:
+        raise ValueError("Encryption key must be 32 bytes")
+
+    cdef EVP_CIPHER_CTX *ctx = EVP_CIPHER_CTX_new()
+    if ctx == NULL:
+        raise MemoryError()
+
+    cdef list plaintexts = []
+    cdef const char *b64
+    cdef Py_ssize_t b64_len
+    cdef unsigned char *data = NULL
+    cdef unsigned char *out = NULL
+    cdef Py_ssize_t capacity = 0
+    cdef int data_len, ct_len, out_len, final_len
+
+    try:
+        if (EVP_DecryptInit_ex(ctx, EVP_aes_256_gcm(), NULL, key, NULL) != 1 or
+                EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_SET_IVLEN, NONCE_SIZE, NULL) != 1):
+            raise ValueError("Failed to initialize AES-256-GCM")
+
+        for ciphertext in ciphertexts:
+            if not ciphertext:
+                plaintexts.append("")
+                continue
+
+            if isinstance(ciphertext, bytes):
+                b64 = PyBytes_AS_STRING(ciphertext)
+                b64_len = PyBytes_GET_SIZE(ciphertext)
+            else:
+                b64 = PyUnicode_AsUTF8AndSize(ciphertext, &b64_len)
+            if b64_len % 4 != 0 or b64_len > 0x7fffffff:
+                raise ValueError("Invalid base64 ciphertext")
+
+            # Scratch buffers are reused across rows and only grown when needed
+            if b64_len > capacity:
+                free(data)
+                free(out)
+                data = NULL
+                out = NULL
+                data = <unsigned char *>malloc(b64_len // 4 * 3)
+                out = <unsigned char *>malloc(b64_len // 4 * 3)
+                if data == NULL or out == NULL:
+                    raise MemoryError()
+                capacity = b64_len
+
+            data_len = EVP_DecodeBlock(data, <const unsigned char *>b64, <int>b64_len)
+            if data_len < 0:
+                raise ValueError("Invalid base64 ciphertext")
+            # EVP_DecodeBlock keeps the zero bytes produced by '=' padding
+            if b64[b64_len - 1] == b'=':
+                data_len -= 1
+                if b64[b64_len - 2] == b'=':
+                    data_len -= 1
+
+            ct_len = data_len - NONCE_SIZE - TAG_SIZE
+            if ct_len < 0:
+                raise ValueError("Ciphertext too short")
+
+            if (EVP_DecryptInit_ex(ctx, NULL, NULL, NULL, data) != 1 or
+                    EVP_DecryptUpdate(ctx, out, &out_len, data + NONCE_SIZE, ct_len) != 1 or
+                    EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_SET_TAG, TAG_SIZE,
+                                        data + NONCE_SIZE + ct_len) != 1 or
+                    EVP_DecryptFinal_ex(ctx, out + out_len, &final_len) != 1):
+                raise ValueError("Authentication failed")
+
+            plaintexts.append(PyUnicode_DecodeUTF8(<char *>out, out_len + final_len, "strict"))
+    finally:
+        free(data)
+        free(out)
+        EVP_CIPHER_CTX_free(ctx)
+
+    return plaintexts
@@ -9,7 +9,7 @@ This script:
 4. Exports decrypted data for review
 
 Requirements:
-    pip install psycopg2-binary python-dotenv cryptography
+    pip install -r scripts/requirements.txt
 
 Usage:
     python scripts/decrypt_validation.py [options]
@@ -21,6 +21,12 @@ Options:
     --all-users         Decrypt all users
     --all-entries       Decrypt all journal entries
     --limit N           Limit number of entries (default: 100)
+    --validate-only     With --all-users, only check each email decrypts and
+                        matches its blind index (no plaintext is output)
+    --pretty            Pretty print --all-* output instead of JSON lines
+
+--all-users and --all-entries write one JSON object per row to stdout
+(status messages go to stderr), so the output can be piped to jq or a file.
 
 Environment variables required:
     DATABASE_URL - PostgreSQL connection string
@@ -31,17 +37,63 @@ Environment variables required:
 import os
 import sys
 import base64
+import binascii
+import collections
 import hmac
 import hashlib
-from typing import Optional, Dict, Any, List
+import functools
+import itertools
+import json
+import multiprocessing
+import queue
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Iterable, Iterator, List, TextIO, Tuple, Union
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+# Optional native batch decryption (see _fastcrypto.pyx for build steps)
+try:
+    from _fastcrypto import decrypt_batch as fast_decrypt_batch
+except ImportError:
+    fast_decrypt_batch = None
+
 # Load environment variables
 load_dotenv()
 
+# SHA-256 block size, used to pad the blind index key for HMAC
+HMAC_BLOCK_SIZE = 64
+
+# Blind index digests memoized per DecryptionService
+BLIND_INDEX_CACHE_SIZE = 8192
+
+# Rows grouped per batch when streaming --all-* results
+STREAM_BATCH_SIZE = 1000
+
+# Only the columns the script actually decrypts or prints. The --all-*
+# workers unpack streamed row tuples in exactly these orders
+USER_FIELDS = ('id', 'email', 'email_blind_index', 'goal', 'created_at')
+ENTRY_FIELDS = ('id', 'user_id', 'topics', 'created_at')
+VALIDATE_FIELDS = ('id', 'email', 'email_blind_index')
+USER_COLUMNS = ", ".join(USER_FIELDS)
+ENTRY_COLUMNS = ", ".join(ENTRY_FIELDS)
+
+# Rows handed to each decryption worker per task in --all-* modes
+DECRYPT_CHUNK_SIZE = 256
+
+
+def _hmac_sha256(inner_state, outer_state, data: bytes) -> bytes:
+    """HMAC-SHA256 of data from precomputed inner/outer padded-key states"""
+    inner = inner_state.copy()
+    inner.update(data)
+    outer = outer_state.copy()
+    outer.update(inner.digest())
+    return outer.digest()
+
 
 class DecryptionService:
     """Python implementation of the Go decryption service"""
@@ -52,40 +104,143 @@ class DecryptionService:
         if len(blind_index_key) != 32:
             raise ValueError("Blind index key must be 32 bytes")
 
+        self.encryption_key = encryption_key
         self.aesgcm = AESGCM(encryption_key)
         self.blind_index_key = blind_index_key
 
-    def decrypt(self, ciphertext: str) -> str:
-        """Decrypt ciphertext using AES-256-GCM"""
+        # HMAC-SHA256 with the inner/outer padded key blocks hashed once up
+        # front; each blind index then only copies these states (RFC 2104)
+        padded_key = blind_index_key.ljust(HMAC_BLOCK_SIZE, b'\x00')
+        self._hmac_inner = hashlib.sha256(bytes(b ^ 0x36 for b in padded_key))
+        self._hmac_outer = hashlib.sha256(bytes(b ^ 0x5c for b in padded_key))
+
+        # Repeated plaintexts (seed data, test fixtures) reuse their digest.
+        # The cache is keyed on plaintext, so only the paths that decrypt for
+        # output use it; validate() doesn't. It wraps the hash states rather
+        # than a bound method so it doesn't hold a reference back to self
+        self._cached_hmac_digest = functools.lru_cache(maxsize=BLIND_INDEX_CACHE_SIZE)(
+            functools.partial(_hmac_sha256, self._hmac_inner, self._hmac_outer)
+        )
+
+    def decrypt(self, ciphertext: Union[str, bytes]) -> str:
+        """Decrypt base64 ciphertext (str or ASCII bytes) using AES-256-GCM"""
         if not ciphertext:
             return ""
 
         try:
             # Base64 decode
             data = base64.b64decode(ciphertext)
+        except Exception as e:
+            raise ValueError(f"Decryption failed: {e}")
 
-            # Extract nonce and ciphertext
-            nonce = data[:12]
-            encrypted = data[12:]
+        return self.decrypt_bytes(data)
 
-            # Decrypt
-            plaintext = self.aesgcm.decrypt(nonce, encrypted, None)
+    def decrypt_bytes(self, data: bytes) -> str:
+        """Decrypt already base64-decoded nonce + ciphertext bytes"""
+        try:
+            # Extract nonce and ciphertext, then decrypt
+            plaintext = self.aesgcm.decrypt(data[:12], data[12:], None)
             return plaintext.decode('utf-8')
         except Exception as e:
             raise ValueError(f"Decryption failed: {e}")
 
+    def decrypt_many(self, ciphertexts: List[Union[str, bytes]]) -> List[str]:
+        """Decrypt a batch of ciphertexts using AES-256-GCM.
+
+        Same result as calling decrypt() on each item, with the per-call
+        lookups hoisted out of the loop, or the whole loop run in C when the
+        _fastcrypto extension is built. Raises ValueError if any item fails.
+        """
+        if fast_decrypt_batch is not None:
+            try:
+                return fast_decrypt_batch(self.encryption_key, list(ciphertexts))
+            except ValueError as e:
+                raise ValueError(f"Decryption failed: {e}")
+
+        a2b_base64 = binascii.a2b_base64
+        aes_decrypt = self.aesgcm.decrypt
+        plaintexts = []
+        append = plaintexts.append
+
+        try:
+            for ciphertext in ciphertexts:
+                if not ciphertext:
+                    append("")
+                    continue
+                data = a2b_base64(ciphertext)
+                append(aes_decrypt(data[:12], data[12:], None).decode('utf-8'))
+        except Exception as e:
+            raise ValueError(f"Decryption failed: {e}")
+
+        return plaintexts
+
+    def blind_index_digest(self, plaintext: str) -> bytes:
+        """Compute the raw HMAC-SHA256 digest behind a blind index"""
+        if not plaintext:
+            return b""
+
+        return self._cached_hmac_digest(plaintext.encode('utf-8'))
+
     def generate_blind_index(self, plaintext: str) -> str:
         """Generate HMAC-SHA256 blind index for searching"""
-        if not plaintext:
-            return ""
+        return base64.b64encode(self.blind_index_digest(plaintext)).decode('utf-8')
+
+    def verify_blind_index(self, plaintext: str, blind_index: Union[str, bytes]) -> bool:
+        """Verify that a blind index matches the plaintext.
+
+        Accepts the stored base64 index or its already-decoded bytes, and
+        compares raw digests in constant time.
+        """
+        if isinstance(blind_index, str):
+            try:
+                blind_index = base64.b64decode(blind_index, validate=True)
+            except ValueError:
+                # binascii.Error, or a plain ValueError for non-ASCII input
+                return False
 
-        h = hmac.new(self.blind_index_key, plaintext.encode('utf-8'), hashlib.sha256)
-        return base64.b64encode(h.digest()).decode('utf-8')
+        return hmac.compare_digest(self.blind_index_digest(plaintext), blind_index)
 
-    def verify_blind_index(self, plaintext: str, blind_index: str) -> bool:
-        """Verify that a blind index matches the plaintext"""
-        generated_index = self.generate_blind_index(plaintext)
-        return generated_index == blind_index
+    def validate(self, ciphertext: Union[str, bytes], blind_index: str) -> bool:
+        """Check that ciphertext decrypts and matches its blind index.
+
+        The plaintext is only used as raw bytes for the HMAC and is never
+        decoded or returned.
+        """
+        if not ciphertext or not blind_index:
+            return False
+
+        try:
+            data = binascii.a2b_base64(ciphertext)
+            plaintext = self.aesgcm.decrypt(data[:12], data[12:], None)
+            expected = base64.b64decode(blind_index, validate=True)
+        except Exception:
+            return False
+
+        return hmac.compare_digest(_hmac_sha256(self._hmac_inner, self._hmac_outer, plaintext), expected)
+
+
+def parse_key(value: str) -> bytes:
+    """Convert a key from the environment into raw 32-byte key material.
+
+    Keys from scripts/generate_keys.py are base64-encoded 32 random bytes;
+    legacy keys are strings of exactly 32 UTF-8 bytes, used as-is.
+    Mirrors crypto.ParseKey in the Go app: the whole value is tried as
+    URL-safe base64, then as standard base64, never a mix of the two.
+    """
+    raw = value.encode('utf-8')
+    if len(raw) == 32:
+        return raw
+
+    # A value with '+' or '/' can only be standard base64; anything else is
+    # decoded as URL-safe, which is what Go's first attempt accepts
+    altchars = None if '+' in value or '/' in value else b'-_'
+    try:
+        key = base64.b64decode(value, altchars=altchars, validate=True)
+    except ValueError:
+        raise ValueError("key must be 32 characters or base64-encoded 32 bytes")
+    if len(key) != 32:
+        raise ValueError("key must decode to exactly 32 bytes")
+    return key
 
 
 def get_db_connection():
@@ -97,17 +252,54 @@ def get_db_connection():
     return psycopg2.connect(database_url)
 
 
+def _decrypt_user_fields(dec_service: DecryptionService, user: Dict[str, Any]) -> Dict[str, Any]:
+    """Decrypt the sensitive fields of a fetched user row"""
+    decrypted_user = dict(user)
+
+    try:
+        decrypted_user['email_decrypted'] = dec_service.decrypt(user['email'])
+
+        # Verify blind index
+        if user['email_blind_index']:
+            is_valid = dec_service.verify_blind_index(
+                decrypted_user['email_decrypted'],
+                user['email_blind_index']
+            )
+            decrypted_user['blind_index_valid'] = is_valid
+
+        if user['goal']:
+            decrypted_user['goal_decrypted'] = dec_service.decrypt(user['goal'])
+
+    except Exception as e:
+        decrypted_user['decryption_error'] = str(e)
+
+    return decrypted_user
+
+
+def _decrypt_entry_fields(dec_service: DecryptionService, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Decrypt the sensitive fields of a fetched journal entry row"""
+    decrypted_entry = dict(entry)
+
+    try:
+        if entry['topics']:
+            decrypted_entry['topics_decrypted'] = dec_service.decrypt(entry['topics'])
+    except Exception as e:
+        decrypted_entry['decryption_error'] = str(e)
+
+    return decrypted_entry
+
+
 def decrypt_user(conn, dec_service: DecryptionService, user_id: Optional[int] = None,
                  email: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """Decrypt a single user's data"""
     cursor = conn.cursor(cursor_factory=RealDictCursor)
 
     if user_id:
-        cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+        cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = %s", (user_id,))
     elif email:
         # Search by blind index
         blind_index = dec_service.generate_blind_index(email)
-        cursor.execute("SELECT * FROM users WHERE email_blind_index = %s", (blind_index,))
+        cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE email_blind_index = %s", (blind_index,))
     else:
         raise ValueError("Must provide either user_id or email")
 
@@ -117,118 +309,441 @@ def decrypt_user(conn, dec_service: DecryptionService, user_id: Optional[int] =
     if not user:
         return None
 
-    # Decrypt sensitive fields
-    decrypted_user = dict(user)
+    return _decrypt_user_fields(dec_service, user)
+
+
+# PostgreSQL binary COPY format: signature, then int32 flags and int32
+# header-extension length (https://www.postgresql.org/docs/current/sql-copy.html)
+COPY_BINARY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_CHUNK_SIZE = 64 * 1024
+COPY_QUEUE_CHUNKS = 64
+
+_INT16 = struct.Struct('!h')
+_INT32 = struct.Struct('!i')
+_INT64 = struct.Struct('!q')
+_PG_EPOCH = datetime(2000, 1, 1)
+_PG_EPOCH_UTC = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
 
+def _decode_text(data: bytes) -> str:
+    return data.decode('utf-8')
+
+
+# Binary wire decoders by column type oid
+COPY_DECODERS = {
+    16: lambda data: data == b'\x01',                                              # bool
+    20: lambda data: _INT64.unpack(data)[0],                                       # int8
+    21: lambda data: _INT16.unpack(data)[0],                                       # int2
+    23: lambda data: _INT32.unpack(data)[0],                                       # int4
+    25: _decode_text,                                                              # text
+    1043: _decode_text,                                                            # varchar
+    1114: lambda data: _PG_EPOCH + timedelta(microseconds=_INT64.unpack(data)[0]),      # timestamp
+    1184: lambda data: _PG_EPOCH_UTC + timedelta(microseconds=_INT64.unpack(data)[0]),  # timestamptz
+}
+
+
+def _put_unless_stopped(chunks: queue.Queue, stop: threading.Event, item) -> bool:
+    """Put item on the queue, giving up if the consumer has gone away"""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _CopyChunkWriter:
+    """File-like sink for copy_expert that hands fixed-size chunks to a queue"""
+
+    def __init__(self, chunks: queue.Queue, stop: threading.Event):
+        self._chunks = chunks
+        self._stop = stop
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        if len(self._buf) >= COPY_CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if not self._buf:
+            return
+        chunk = bytes(self._buf)
+        self._buf.clear()
+        if not _put_unless_stopped(self._chunks, self._stop, chunk):
+            raise RuntimeError("COPY consumer stopped")
+
+
+class _CopyStreamReader:
+    """Exact-length reads over the chunks produced by a COPY"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buf = b''
+        self._pos = 0
+
+    def read(self, n: int) -> bytes:
+        end = self._pos + n
+        if end <= len(self._buf):
+            data = self._buf[self._pos:end]
+            self._pos = end
+            return data
+
+        parts = [self._buf[self._pos:]]
+        have = len(parts[0])
+        while have < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise ValueError("Unexpected end of COPY data")
+            parts.append(chunk)
+            have += len(chunk)
+        self._buf = b''.join(parts)
+        self._pos = n
+        return self._buf[:n]
+
+
+def _copy_chunks(conn, query: str) -> Iterator[bytes]:
+    """Run COPY (query) TO STDOUT WITH BINARY and yield its output in chunks.
+
+    copy_expert only returns once the whole result has been written, so it runs
+    on a background thread feeding a bounded queue; rows can be parsed and
+    decrypted while the server is still sending the rest.
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=COPY_QUEUE_CHUNKS)
+    stop = threading.Event()
+    done = object()
+    error = []
+
+    def produce():
+        cursor = conn.cursor()
+        try:
+            writer = _CopyChunkWriter(chunks, stop)
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT BINARY)", writer)
+            writer.flush()
+        except Exception as e:
+            error.append(e)
+        finally:
+            cursor.close()
+            _put_unless_stopped(chunks, stop, done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
     try:
-        decrypted_user['email_decrypted'] = dec_service.decrypt(user['email'])
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+        if error:
+            raise error[0]
+    finally:
+        stop.set()
+        producer.join()
 
-        # Verify blind index
-        if user['email_blind_index']:
-            is_valid = dec_service.verify_blind_index(
-                decrypted_user['email_decrypted'],
-                user['email_blind_index']
-            )
-            decrypted_user['blind_index_valid'] = is_valid
 
-        if user['goal']:
-            decrypted_user['goal_decrypted'] = dec_service.decrypt(user['goal'])
+def copy_rows(conn, query: str, raw_columns: Iterable[str] = ()) -> Iterator[Tuple[Any, ...]]:
+    """Stream the rows of query via binary COPY, decoded into tuples in column order.
 
-    except Exception as e:
-        decrypted_user['decryption_error'] = str(e)
+    Column names and type oids come from a one-off LIMIT 0 probe of the same
+    query, so each field is decoded with a plain struct unpack. Columns named
+    in raw_columns are left as the bytes received from the server, which for
+    base64 ciphertext skips building a str that would only be encoded again.
+    """
+    raw_columns = set(raw_columns)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM ({query}) AS q LIMIT 0")
+    try:
+        decoders = [
+            bytes if column.name in raw_columns else COPY_DECODERS[column.type_code]
+            for column in cursor.description
+        ]
+    except KeyError as e:
+        raise ValueError(f"Unsupported column type oid for COPY: {e}")
+    finally:
+        cursor.close()
 
-    return decrypted_user
+    chunks = _copy_chunks(conn, query)
+    try:
+        reader = _CopyStreamReader(chunks)
+        header = reader.read(len(COPY_BINARY_SIGNATURE) + 8)
+        if not header.startswith(COPY_BINARY_SIGNATURE):
+            raise ValueError("Invalid binary COPY header")
+        extension_length = _INT32.unpack_from(header, len(COPY_BINARY_SIGNATURE) + 4)[0]
+        if extension_length:
+            reader.read(extension_length)
+
+        read = reader.read
+        unpack_int16 = _INT16.unpack
+        unpack_int32 = _INT32.unpack
+        while True:
+            field_count = unpack_int16(read(2))[0]
+            if field_count == -1:
+                return
+            if field_count != len(decoders):
+                raise ValueError(f"Expected {len(decoders)} COPY fields, got {field_count}")
+
+            row = []
+            for decode in decoders:
+                length = unpack_int32(read(4))[0]
+                row.append(None if length == -1 else decode(read(length)))
+            yield tuple(row)
+    finally:
+        chunks.close()
 
 
-def decrypt_all_users(conn, dec_service: DecryptionService) -> List[Dict[str, Any]]:
-    """Decrypt all users' data"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM users ORDER BY id")
-    users = cursor.fetchall()
-    cursor.close()
+def _batched(rows: Iterator[Tuple[Any, ...]], size: int) -> Iterator[List[Tuple[Any, ...]]]:
+    """Group an iterator of rows into lists of at most size rows"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    decrypted_users = []
 
-    for user in users:
-        decrypted_user = dict(user)
+# Per-process decryption service, set up once by _init_worker in each pool worker
+_worker_service: Optional[DecryptionService] = None
 
-        try:
-            decrypted_user['email_decrypted'] = dec_service.decrypt(user['email'])
 
-            # Verify blind index
-            if user['email_blind_index']:
-                is_valid = dec_service.verify_blind_index(
-                    decrypted_user['email_decrypted'],
-                    user['email_blind_index']
-                )
-                decrypted_user['blind_index_valid'] = is_valid
+def _init_worker(encryption_key: bytes, blind_index_key: bytes):
+    """Build the decryption service once per pool worker"""
+    global _worker_service
+    _worker_service = DecryptionService(encryption_key, blind_index_key)
 
-            if user['goal']:
-                decrypted_user['goal_decrypted'] = dec_service.decrypt(user['goal'])
 
-        except Exception as e:
-            decrypted_user['decryption_error'] = str(e)
+def _decrypt_user_chunk(users: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Decrypt a chunk of USER_FIELDS user tuples inside a pool worker"""
+    dec_service = _worker_service
+    try:
+        emails = dec_service.decrypt_many([email for _, email, _, _, _ in users])
+        goals = dec_service.decrypt_many([goal for _, _, _, goal, _ in users])
+    except ValueError:
+        # Redo the chunk row by row so only the bad rows carry an error
+        return [_decrypt_user_fields(dec_service, dict(zip(USER_FIELDS, user))) for user in users]
 
+    decrypted_users = []
+    for (user_id, email, blind_index, goal, created_at), email_plain, goal_plain in zip(users, emails, goals):
+        # The only dict built per row is the one handed back for output
+        decrypted_user = {
+            'id': user_id,
+            'email': email,
+            'email_blind_index': blind_index,
+            'goal': goal,
+            'created_at': created_at,
+            'email_decrypted': email_plain,
+        }
+        if blind_index:
+            decrypted_user['blind_index_valid'] = dec_service.verify_blind_index(email_plain, blind_index)
+        if goal:
+            decrypted_user['goal_decrypted'] = goal_plain
         decrypted_users.append(decrypted_user)
-
     return decrypted_users
 
 
+def _validate_user_chunk(users: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Validate a chunk of VALIDATE_FIELDS user tuples inside a pool worker"""
+    validate = _worker_service.validate
+    return [
+        {'id': user_id, 'ok': validate(email, blind_index)}
+        for user_id, email, blind_index in users
+    ]
+
+
+def _decrypt_entry_chunk(entries: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Decrypt a chunk of ENTRY_FIELDS journal entry tuples inside a pool worker"""
+    try:
+        plaintexts = _worker_service.decrypt_many([topics for _, _, topics, _ in entries])
+    except ValueError:
+        # Redo the chunk row by row so only the bad rows carry an error
+        return [
+            _decrypt_entry_fields(_worker_service, dict(zip(ENTRY_FIELDS, entry)))
+            for entry in entries
+        ]
+
+    decrypted_entries = []
+    for (entry_id, user_id, topics, created_at), plaintext in zip(entries, plaintexts):
+        decrypted_entry = {
+            'id': entry_id,
+            'user_id': user_id,
+            'topics': topics,
+            'created_at': created_at,
+        }
+        if topics:
+            decrypted_entry['topics_decrypted'] = plaintext
+        decrypted_entries.append(decrypted_entry)
+    return decrypted_entries
+
+
+def _decrypt_stream(batches: Iterator[List[Tuple[Any, ...]]], dec_service: DecryptionService,
+                    decrypt_chunk, sort_key=None) -> Iterator[Dict[str, Any]]:
+    """Fan streamed row batches out to a process pool, keeping the original row order.
+
+    Each task is a chunk of DECRYPT_CHUNK_SIZE rows, and the pool has one
+    worker per CPU. Batches keep being read from the server and submitted
+    until about two chunks per worker are queued, so every worker stays busy
+    while the oldest batch's results are collected. With sort_key, rows are
+    grouped by it (e.g. ciphertext length) within each batch before dispatch,
+    and put back in their original order afterwards. A stream that fits in
+    one chunk is decrypted inline without a pool.
+    """
+    batch = next(batches, None)
+    if batch is None:
+        return
+
+    if len(batch) <= DECRYPT_CHUNK_SIZE:
+        # A single chunk (e.g. the default --all-entries limit) decrypts
+        # faster in this process than it takes to start a pool
+        _init_worker(dec_service.encryption_key, dec_service.blind_index_key)
+        for batch in itertools.chain([batch], batches):
+            yield from decrypt_chunk(batch)
+        return
+
+    workers = os.cpu_count() or 1
+    # The COPY producer thread is already running and holds the connection,
+    # so workers come from a forkserver rather than a fork of this process
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('forkserver'),
+        initializer=_init_worker,
+        initargs=(dec_service.encryption_key, dec_service.blind_index_key),
+    ) as executor:
+        in_flight = collections.deque()
+        queued_chunks = 0
+        while True:
+            if batch:
+                order = None
+                if sort_key is not None:
+                    order = sorted(range(len(batch)), key=lambda i: sort_key(batch[i]))
+                    batch = [batch[i] for i in order]
+                chunks = [
+                    batch[i:i + DECRYPT_CHUNK_SIZE]
+                    for i in range(0, len(batch), DECRYPT_CHUNK_SIZE)
+                ]
+                in_flight.append((executor.map(decrypt_chunk, chunks), order, len(chunks)))
+                queued_chunks += len(chunks)
+
+            # Read further ahead until the queue covers every worker twice over
+            while in_flight and (not batch or queued_chunks >= 2 * workers):
+                chunk_results, order, chunk_count = in_flight.popleft()
+                queued_chunks -= chunk_count
+                yield from _collect_results(chunk_results, order)
+
+            if not batch:
+                break
+            batch = next(batches, None)
+
+
+def _collect_results(chunk_results: Iterator[List[Dict[str, Any]]],
+                     order: Optional[List[int]]) -> List[Dict[str, Any]]:
+    """Flatten a batch's chunk results, undoing any dispatch reordering"""
+    rows = [row for chunk in chunk_results for row in chunk]
+    if order is None:
+        return rows
+
+    restored = [None] * len(rows)
+    for position, index in enumerate(order):
+        restored[index] = rows[position]
+    return restored
+
+
+def _topics_length(entry: Tuple[Any, ...]) -> int:
+    _, _, topics, _ = entry
+    return len(topics or b'')
+
+
+def decrypt_all_users(conn, dec_service: DecryptionService,
+                      validate_only: bool = False) -> Iterator[Dict[str, Any]]:
+    """Decrypt all users' data, streaming rows with a binary COPY.
+
+    With validate_only, only {'id', 'ok'} is produced per user, where ok means
+    the email decrypts and matches its blind index; no plaintext is kept,
+    not even in the blind index cache.
+    """
+    if validate_only:
+        query = f"SELECT {', '.join(VALIDATE_FIELDS)} FROM users ORDER BY id"
+    else:
+        query = f"SELECT {USER_COLUMNS} FROM users ORDER BY id"
+
+    decrypt_chunk = _validate_user_chunk if validate_only else _decrypt_user_chunk
+    batches = _batched(copy_rows(conn, query, raw_columns=('email', 'goal')), STREAM_BATCH_SIZE)
+    yield from _decrypt_stream(batches, dec_service, decrypt_chunk)
+
+
 def decrypt_journal_entry(conn, dec_service: DecryptionService, entry_id: int) -> Optional[Dict[str, Any]]:
     """Decrypt a single journal entry's data"""
     cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM journal_entries WHERE id = %s", (entry_id,))
+    cursor.execute(f"SELECT {ENTRY_COLUMNS} FROM journal_entries WHERE id = %s", (entry_id,))
     entry = cursor.fetchone()
     cursor.close()
 
     if not entry:
         return None
 
-    decrypted_entry = dict(entry)
+    return _decrypt_entry_fields(dec_service, entry)
 
-    try:
-        if entry['topics']:
-            decrypted_entry['topics_decrypted'] = dec_service.decrypt(entry['topics'])
-    except Exception as e:
-        decrypted_entry['decryption_error'] = str(e)
 
-    return decrypted_entry
+def decrypt_all_entries(conn, dec_service: DecryptionService, limit: int = 100) -> Iterator[Dict[str, Any]]:
+    """Decrypt journal entries (limited for performance), streaming rows with a binary COPY"""
+    cursor = conn.cursor()
+    query = cursor.mogrify(
+        f"SELECT {ENTRY_COLUMNS} FROM journal_entries ORDER BY id DESC LIMIT %s", (limit,)
+    ).decode('utf-8')
+    cursor.close()
 
+    batches = _batched(copy_rows(conn, query, raw_columns=('topics',)), STREAM_BATCH_SIZE)
+    # Similar-length ciphertexts are decrypted together for steadier per-call cost
+    yield from _decrypt_stream(batches, dec_service, _decrypt_entry_chunk, sort_key=_topics_length)
 
-def decrypt_all_entries(conn, dec_service: DecryptionService, limit: int = 100) -> List[Dict[str, Any]]:
-    """Decrypt journal entries (limited for performance)"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(f"SELECT * FROM journal_entries ORDER BY id DESC LIMIT %s", (limit,))
-    entries = cursor.fetchall()
-    cursor.close()
 
-    decrypted_entries = []
+def user_record(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the decrypted user fields emitted as one JSON line"""
+    return {
+        'id': user.get('id'),
+        'email': user.get('email_decrypted'),
+        'blind_index_valid': user.get('blind_index_valid'),
+        'goal': user.get('goal_decrypted'),
+        'created_at': user.get('created_at'),
+        'decryption_error': user.get('decryption_error'),
+    }
 
-    for entry in entries:
-        decrypted_entry = dict(entry)
 
-        try:
-            if entry['topics']:
-                decrypted_entry['topics_decrypted'] = dec_service.decrypt(entry['topics'])
-        except Exception as e:
-            decrypted_entry['decryption_error'] = str(e)
+def entry_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the decrypted journal entry fields emitted as one JSON line"""
+    return {
+        'id': entry.get('id'),
+        'user_id': entry.get('user_id'),
+        'topics': entry.get('topics_decrypted'),
+        'created_at': entry.get('created_at'),
+        'decryption_error': entry.get('decryption_error'),
+    }
 
-        decrypted_entries.append(decrypted_entry)
 
-    return decrypted_entries
+def write_jsonl(out: TextIO, record: Dict[str, Any]):
+    """Write a record as a single JSON line"""
+    out.write(json.dumps(record, default=str, ensure_ascii=False) + '\n')
+
+
+def _ciphertext_preview(value: Union[str, bytes, None]) -> str:
+    """First 50 characters of a stored ciphertext, whether fetched as str or bytes"""
+    if isinstance(value, bytes):
+        value = value.decode('ascii', errors='replace')
+    return (value or '')[:50]
 
 
 def print_user(user: Dict[str, Any]):
     """Pretty print user data"""
     print(f"\n{'='*60}")
     print(f"User ID: {user.get('id')}")
-    print(f"Username: {user.get('username')}")
-    print(f"Email (encrypted): {user.get('email', '')[:50]}...")
+    print(f"Email (encrypted): {_ciphertext_preview(user.get('email'))}...")
     print(f"Email (decrypted): {user.get('email_decrypted', 'N/A')}")
     print(f"Blind Index Valid: {user.get('blind_index_valid', 'N/A')}")
 
     if user.get('goal'):
-        print(f"Goal (encrypted): {user.get('goal', '')[:50]}...")
+        print(f"Goal (encrypted): {_ciphertext_preview(user.get('goal'))}...")
         print(f"Goal (decrypted): {user.get('goal_decrypted', 'N/A')}")
 
     if user.get('decryption_error'):
@@ -245,7 +760,7 @@ def print_entry(entry: Dict[str, Any]):
     print(f"User ID: {entry.get('user_id')}")
 
     if entry.get('topics'):
-        print(f"Topics (encrypted): {entry.get('topics', '')[:50]}...")
+        print(f"Topics (encrypted): {_ciphertext_preview(entry.get('topics'))}...")
         print(f"Topics (decrypted): {entry.get('topics_decrypted', 'N/A')}")
     else:
         print("Topics: None")
@@ -259,40 +774,45 @@ def print_entry(entry: Dict[str, Any]):
 
 def main():
     """Main validation function"""
-    print("=" * 60)
-    print("Database Decryption & Validation Script")
-    print("=" * 60)
+    # --all-* modes stream JSON lines on stdout unless --pretty is given, so
+    # status messages go to stderr to keep that stream machine-readable
+    jsonl = ('--all-users' in sys.argv or '--all-entries' in sys.argv) and '--pretty' not in sys.argv
+    status = sys.stderr if jsonl else sys.stdout
+
+    print("=" * 60, file=status)
+    print("Database Decryption & Validation Script", file=status)
+    print("=" * 60, file=status)
 
     # Get encryption keys from environment
     encryption_key = os.getenv('ENCRYPTION_KEY')
     blind_index_key = os.getenv('BLIND_INDEX_KEY')
 
     if not encryption_key or not blind_index_key:
-        print("Error: ENCRYPTION_KEY and BLIND_INDEX_KEY environment variables are required")
+        print("Error: ENCRYPTION_KEY and BLIND_INDEX_KEY environment variables are required", file=status)
         sys.exit(1)
 
     # Convert keys to bytes
-    encryption_key_bytes = encryption_key.encode('utf-8')
-    blind_index_key_bytes = blind_index_key.encode('utf-8')
-
-    if len(encryption_key_bytes) != 32 or len(blind_index_key_bytes) != 32:
-        print("Error: Keys must be exactly 32 bytes")
+    try:
+        encryption_key_bytes = parse_key(encryption_key)
+        blind_index_key_bytes = parse_key(blind_index_key)
+    except ValueError as e:
+        print(f"Error: Invalid key: {e}", file=status)
         sys.exit(1)
 
     # Initialize decryption service
     try:
         dec_service = DecryptionService(encryption_key_bytes, blind_index_key_bytes)
-        print("✓ Decryption service initialized\n")
+        print("✓ Decryption service initialized\n", file=status)
     except Exception as e:
-        print(f"Error initializing decryption service: {e}")
+        print(f"Error initializing decryption service: {e}", file=status)
         sys.exit(1)
 
     # Connect to database
     try:
         conn = get_db_connection()
-        print("✓ Database connection established\n")
+        print("✓ Database connection established\n", file=status)
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        print(f"Error connecting to database: {e}", file=status)
         sys.exit(1)
 
     try:
@@ -304,7 +824,7 @@ def main():
             if user:
                 print_user(user)
             else:
-                print(f"User {user_id} not found")
+                print(f"User {user_id} not found", file=status)
 
         elif '--user-email' in sys.argv:
             idx = sys.argv.index('--user-email')
@@ -313,7 +833,7 @@ def main():
             if user:
                 print_user(user)
             else:
-                print(f"User with email {email} not found")
+                print(f"User with email {email} not found", file=status)
 
         elif '--entry-id' in sys.argv:
             idx = sys.argv.index('--entry-id')
@@ -322,13 +842,30 @@ def main():
             if entry:
                 print_entry(entry)
             else:
-                print(f"Journal entry {entry_id} not found")
+                print(f"Journal entry {entry_id} not found", file=status)
+
+        elif '--all-users' in sys.argv and '--validate-only' in sys.argv:
+            count = 0
+            invalid = 0
+            for result in decrypt_all_users(conn, dec_service, validate_only=True):
+                if jsonl:
+                    write_jsonl(sys.stdout, result)
+                else:
+                    print(f"User {result['id']}: {'✓ valid' if result['ok'] else '✗ INVALID'}")
+                count += 1
+                if not result['ok']:
+                    invalid += 1
+            print(f"\nValidated {count} users ({invalid} invalid)", file=status)
 
         elif '--all-users' in sys.argv:
-            users = decrypt_all_users(conn, dec_service)
-            print(f"Decrypted {len(users)} users:\n")
-            for user in users:
-                print_user(user)
+            count = 0
+            for user in decrypt_all_users(conn, dec_service):
+                if jsonl:
+                    write_jsonl(sys.stdout, user_record(user))
+                else:
+                    print_user(user)
+                count += 1
+            print(f"\nDecrypted {count} users", file=status)
 
         elif '--all-entries' in sys.argv:
             limit = 100
@@ -336,31 +873,40 @@ def main():
                 idx = sys.argv.index('--limit')
                 limit = int(sys.argv[idx + 1])
 
-            entries = decrypt_all_entries(conn, dec_service, limit)
-            print(f"Decrypted {len(entries)} journal entries (limit: {limit}):\n")
-            for entry in entries:
-                print_entry(entry)
+            count = 0
+            for entry in decrypt_all_entries(conn, dec_service, limit):
+                if jsonl:
+                    write_jsonl(sys.stdout, entry_record(entry))
+                else:
+                    print_entry(entry)
+                count += 1
+            print(f"\nDecrypted {count} journal entries (limit: {limit})", file=status)
 
         else:
-            print("Usage:")
-            print("  --user-id ID                Decrypt specific user by ID")
-            print("  --user-email EMAIL          Decrypt user by email")
-            print("  --entry-id ID               Decrypt specific journal entry by ID")
-            print("  --all-users                 Decrypt all users")
-            print("  --all-entries               Decrypt all journal entries")
-            print("  --limit N                   Limit number of entries (default: 100)")
-            print("\nExamples:")
-            print("  python scripts/decrypt_validation.py --user-id 1")
-            print("  python scripts/decrypt_validation.py --user-email user@example.com")
-            print("  python scripts/decrypt_validation.py --all-users")
-            print("  python scripts/decrypt_validation.py --all-entries --limit 50")
-
-        print("\n" + "=" * 60)
-        print("VALIDATION COMPLETE")
-        print("=" * 60)
+            print("Usage:", file=status)
+            print("  --user-id ID                Decrypt specific user by ID", file=status)
+            print("  --user-email EMAIL          Decrypt user by email", file=status)
+            print("  --entry-id ID               Decrypt specific journal entry by ID", file=status)
+            print("  --all-users                 Decrypt all users", file=status)
+            print("  --all-entries               Decrypt all journal entries", file=status)
+            print("  --limit N                   Limit number of entries (default: 100)", file=status)
+            print("  --validate-only             With --all-users, only check each email decrypts and", file=status)
+            print("                              matches its blind index", file=status)
+            print("  --pretty                    Pretty print --all-* output instead of JSON lines", file=status)
+            print("\nExamples:", file=status)
+            print("  python scripts/decrypt_validation.py --user-id 1", file=status)
+            print("  python scripts/decrypt_validation.py --user-email user@example.com", file=status)
+            print("  python scripts/decrypt_validation.py --all-users", file=status)
+            print("  python scripts/decrypt_validation.py --all-entries --limit 50", file=status)
+            print("  python scripts/decrypt_validation.py --all-users --pretty", file=status)
+            print("  python scripts/decrypt_validation.py --all-users --validate-only", file=status)
+
+        print("\n" + "=" * 60, file=status)
+        print("VALIDATION COMPLETE", file=status)
+        print("=" * 60, file=status)
 
     except Exception as e:
-        print(f"\nError during validation: {e}")
+        print(f"\nError during validation: {e}", file=status)
         import traceback
         traceback.print_exc()
         sys.exit(1)
@@ -6,16 +6,15 @@ Usage:
     python scripts/generate_keys.py
 """
 
-import os
+import base64
 import secrets
 
 def generate_key() -> str:
     """Generate a secure 32-byte key"""
-    # Generate 32 random bytes
+    # Generate 32 random bytes and base64-encode all of them; the Go app and
+    # the Python scripts decode the key back to the raw 32 bytes
     key_bytes = secrets.token_bytes(32)
-    # Convert to a string (keeping as raw bytes in string form)
-    # We'll use the first 32 characters of the hex representation
-    return key_bytes.hex()[:32]
+    return base64.urlsafe_b64encode(key_bytes).decode('ascii')
 
 def main():
     print("=" * 60)
@@ -9,10 +9,16 @@ This script:
 4. Updates the database with encrypted data
 
 Requirements:
-    pip install psycopg2-binary python-dotenv cryptography
+    pip install -r scripts/requirements.txt
 
 Usage:
-    python scripts/migrate_to_encryption.py
+    python scripts/migrate_to_encryption.py [--dry-run] [--in-db]
+
+Options:
+    --dry-run, -n   Show what would change without writing anything
+    --in-db         Encrypt inside PostgreSQL with one UPDATE per table
+                    (needs plpython3u and the cryptography package on the
+                    database server; falls back to the client-side path)
 
 Environment variables required:
     DATABASE_URL - PostgreSQL connection string
@@ -23,18 +29,138 @@ Environment variables required:
 import os
 import sys
 import base64
-import hmac
+import binascii
 import hashlib
-from typing import Optional, Tuple
+import hmac
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 
 # Load environment variables
 load_dotenv()
 
+# AES-GCM nonce and authentication tag sizes, in bytes
+NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+
+# Nonces fetched from os.urandom per refill of the encryption nonce pool
+NONCE_POOL_SIZE = 4096
+
+# SHA-256 block size, used to pad the blind index key for HMAC
+HMAC_BLOCK_SIZE = 64
+
+# Rows fetched per round-trip by the server-side read cursors
+STREAM_BATCH_SIZE = 1000
+
+# Rows written per batched UPDATE, and rows written per commit
+UPDATE_BATCH_SIZE = 1000
+COMMIT_EVERY_ROWS = 5000
+
+# Batched UPDATEs are prepared once per migration and executed with one
+# array per column, so every batch reuses the same parsed statement and plan
+USER_UPDATE_PREPARE = """
+    PREPARE mig_user_upd (int[], text[], text[], text[]) AS
+    UPDATE users
+    SET email = v.email,
+        email_blind_index = v.bi,
+        goal = v.goal
+    FROM unnest($1, $2, $3, $4) AS v(id, email, bi, goal)
+    WHERE users.id = v.id
+"""
+USER_UPDATE_EXECUTE = "EXECUTE mig_user_upd (%s, %s, %s, %s)"
+
+ENTRY_UPDATE_PREPARE = """
+    PREPARE mig_entry_upd (int[], text[]) AS
+    UPDATE journal_entries
+    SET topics = v.topics
+    FROM unnest($1, $2) AS v(id, topics)
+    WHERE journal_entries.id = v.id
+"""
+ENTRY_UPDATE_EXECUTE = "EXECUTE mig_entry_upd (%s, %s)"
+
+# Session-local (pg_temp) PL/Python helpers for the --in-db migration. They
+# produce the same format as EncryptionService: base64(nonce + ciphertext + tag)
+# with a fresh random nonce per value, and base64 HMAC-SHA256 blind indexes.
+# The keys are handed over once through mig_set_keys and kept in the session's
+# GD, so they never appear in the text of the long-running UPDATEs
+SERVER_SIDE_FUNCTIONS_SQL = """
+    CREATE OR REPLACE FUNCTION pg_temp.mig_set_keys(key bytea, bi_key bytea) RETURNS boolean AS $fn$
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        except ImportError:
+            return False
+        GD['mig_aesgcm'] = AESGCM(key)
+        GD['mig_bi_key'] = bi_key
+        return True
+    $fn$ LANGUAGE plpython3u STRICT;
+
+    CREATE OR REPLACE FUNCTION pg_temp.mig_encrypt(plaintext text) RETURNS text AS $fn$
+        import base64, os
+        if not plaintext:
+            return ''
+        nonce = os.urandom(12)
+        ciphertext = GD['mig_aesgcm'].encrypt(nonce, plaintext.encode('utf-8'), None)
+        return base64.b64encode(nonce + ciphertext).decode('ascii')
+    $fn$ LANGUAGE plpython3u STRICT;
+
+    CREATE OR REPLACE FUNCTION pg_temp.mig_blind_index(plaintext text) RETURNS text AS $fn$
+        import base64, hashlib, hmac
+        if not plaintext:
+            return ''
+        digest = hmac.new(GD['mig_bi_key'], plaintext.encode('utf-8'), hashlib.sha256).digest()
+        return base64.b64encode(digest).decode('ascii')
+    $fn$ LANGUAGE plpython3u STRICT;
+
+    CREATE OR REPLACE FUNCTION pg_temp.mig_looks_encrypted(value text) RETURNS boolean AS $fn$
+        import base64, binascii
+        from cryptography.exceptions import InvalidTag
+        try:
+            data = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        if len(data) < 12 + 16:
+            return False
+        try:
+            GD['mig_aesgcm'].decrypt(data[:12], data[12:], None)
+        except InvalidTag:
+            # Possibly ciphertext under another key: abort instead of encrypting it twice
+            plpy.error("value looks encrypted but does not decrypt with ENCRYPTION_KEY")
+        return True
+    $fn$ LANGUAGE plpython3u STRICT;
+"""
+
+USER_IN_DB_UPDATE_SQL = """
+    UPDATE users
+    SET email = pg_temp.mig_encrypt(email),
+        email_blind_index = pg_temp.mig_blind_index(email),
+        goal = pg_temp.mig_encrypt(goal)
+    WHERE (email_blind_index IS NULL OR email_blind_index = '')
+      AND NOT pg_temp.mig_looks_encrypted(email)
+"""
+
+ENTRY_IN_DB_UPDATE_SQL = """
+    UPDATE journal_entries
+    SET topics = pg_temp.mig_encrypt(topics)
+    WHERE topics IS NOT NULL AND topics != ''
+      AND NOT pg_temp.mig_looks_encrypted(topics)
+"""
+
+# A few users and journal entries to spot-check after migrating
+VERIFY_SAMPLE_SQL = """
+    (SELECT 'user' AS kind, id, email AS ciphertext, email_blind_index, goal
+     FROM users
+     LIMIT 3)
+    UNION ALL
+    (SELECT 'entry' AS kind, id, topics, NULL, NULL
+     FROM journal_entries
+     WHERE topics IS NOT NULL AND topics != ''
+     LIMIT 3)
+"""
+
 class EncryptionService:
     """Python implementation of the Go encryption service"""
 
@@ -47,13 +173,38 @@ class EncryptionService:
         self.aesgcm = AESGCM(encryption_key)
         self.blind_index_key = blind_index_key
 
+        # HMAC-SHA256 with the inner/outer padded key blocks hashed once up
+        # front; each blind index then only copies these states (RFC 2104)
+        padded_key = blind_index_key.ljust(HMAC_BLOCK_SIZE, b'\x00')
+        self._hmac_inner = hashlib.sha256(bytes(b ^ 0x36 for b in padded_key))
+        self._hmac_outer = hashlib.sha256(bytes(b ^ 0x5c for b in padded_key))
+
+        # Random nonces are drawn from the OS CSPRNG a page at a time; every
+        # slice is handed out exactly once, and the pool is discarded in a
+        # forked child so parent and child never share nonces
+        self._nonce_pool = b''
+        self._nonce_off = 0
+        self._nonce_pid = os.getpid()
+
+    def _next_nonce(self) -> bytes:
+        """Return a fresh random nonce from the pool, refilling it as needed"""
+        pid = os.getpid()
+        if self._nonce_off + NONCE_SIZE > len(self._nonce_pool) or pid != self._nonce_pid:
+            self._nonce_pool = os.urandom(NONCE_SIZE * NONCE_POOL_SIZE)
+            self._nonce_off = 0
+            self._nonce_pid = pid
+
+        nonce = self._nonce_pool[self._nonce_off:self._nonce_off + NONCE_SIZE]
+        self._nonce_off += NONCE_SIZE
+        return nonce
+
     def encrypt(self, plaintext: str) -> str:
         """Encrypt plaintext using AES-256-GCM"""
         if not plaintext:
             return ""
 
-        # Generate a random 12-byte nonce
-        nonce = os.urandom(12)
+        # Take a random 12-byte nonce from the pool
+        nonce = self._next_nonce()
 
         # Encrypt the data
         ciphertext = self.aesgcm.encrypt(nonce, plaintext.encode('utf-8'), None)
@@ -71,20 +222,41 @@ class EncryptionService:
         data = base64.b64decode(ciphertext)
 
         # Extract nonce and ciphertext
-        nonce = data[:12]
-        encrypted = data[12:]
+        nonce = data[:NONCE_SIZE]
+        encrypted = data[NONCE_SIZE:]
 
         # Decrypt
         plaintext = self.aesgcm.decrypt(nonce, encrypted, None)
         return plaintext.decode('utf-8')
 
+    def decrypt_many(self, ciphertexts: List[str]) -> List[str]:
+        """Decrypt a batch of ciphertexts; raises ValueError if any item fails"""
+        a2b_base64 = binascii.a2b_base64
+        aes_decrypt = self.aesgcm.decrypt
+        plaintexts = []
+
+        try:
+            for ciphertext in ciphertexts:
+                if not ciphertext:
+                    plaintexts.append("")
+                    continue
+                data = a2b_base64(ciphertext)
+                plaintexts.append(aes_decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], None).decode('utf-8'))
+        except Exception as e:
+            raise ValueError(f"Decryption failed: {e}")
+
+        return plaintexts
+
     def generate_blind_index(self, plaintext: str) -> str:
         """Generate HMAC-SHA256 blind index for searching"""
         if not plaintext:
             return ""
 
-        h = hmac.new(self.blind_index_key, plaintext.encode('utf-8'), hashlib.sha256)
-        return base64.b64encode(h.digest()).decode('utf-8')
+        inner = self._hmac_inner.copy()
+        inner.update(plaintext.encode('utf-8'))
+        outer = self._hmac_outer.copy()
+        outer.update(inner.digest())
+        return base64.b64encode(outer.digest()).decode('utf-8')
 
     def encrypt_with_blind_index(self, plaintext: str) -> Tuple[str, str]:
         """Encrypt data and generate blind index"""
@@ -93,6 +265,55 @@ class EncryptionService:
         return encrypted, blind_index
 
 
+def looks_encrypted(value: str, enc_service: EncryptionService) -> bool:
+    """Check whether a value is already ciphertext under our key.
+
+    Encrypted values are strict base64 of nonce + ciphertext + GCM tag, so
+    anything that fails to decode, or decodes to fewer bytes than an empty
+    message would produce, is plaintext. A value with that shape is confirmed
+    with a trial decrypt; if it doesn't authenticate it may be ciphertext
+    under another key (a mistyped or rotated ENCRYPTION_KEY), or a long
+    base64-ish word, so ValueError is raised and the caller leaves the row
+    alone rather than risk encrypting it twice.
+    """
+    try:
+        data = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    if len(data) < NONCE_SIZE + GCM_TAG_SIZE:
+        return False
+
+    try:
+        enc_service.aesgcm.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], None)
+    except InvalidTag:
+        raise ValueError("value looks encrypted but does not decrypt with ENCRYPTION_KEY; left unchanged")
+    return True
+
+
+def parse_key(value: str) -> bytes:
+    """Convert a key from the environment into raw 32-byte key material.
+
+    Keys from scripts/generate_keys.py are base64-encoded 32 random bytes;
+    legacy keys are strings of exactly 32 UTF-8 bytes, used as-is.
+    Mirrors crypto.ParseKey in the Go app: the whole value is tried as
+    URL-safe base64, then as standard base64, never a mix of the two.
+    """
+    raw = value.encode('utf-8')
+    if len(raw) == 32:
+        return raw
+
+    # A value with '+' or '/' can only be standard base64; anything else is
+    # decoded as URL-safe, which is what Go's first attempt accepts
+    altchars = None if '+' in value or '/' in value else b'-_'
+    try:
+        key = base64.b64decode(value, altchars=altchars, validate=True)
+    except ValueError:
+        raise ValueError("key must be 32 characters or base64-encoded 32 bytes")
+    if len(key) != 32:
+        raise ValueError("key must decode to exactly 32 bytes")
+    return key
+
+
 def get_db_connection():
     """Create database connection"""
     database_url = os.getenv('DATABASE_URL')
@@ -102,39 +323,83 @@ def get_db_connection():
     return psycopg2.connect(database_url)
 
 
-def migrate_users(conn, enc_service: EncryptionService, dry_run: bool = False):
-    """Migrate user data to encrypted format"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+def flush_updates(conn, update_cursor, execute_sql: str, rows: List[tuple], uncommitted: int) -> int:
+    """Write pending rows with a single execution of a prepared batch UPDATE.
 
+    Commits once at least COMMIT_EVERY_ROWS rows are uncommitted, to bound
+    transaction size, and returns the new uncommitted row count. If the batch
+    fails, everything since the last commit is rolled back and RuntimeError
+    is raised to stop the migration.
+    """
+    if not rows:
+        return uncommitted
+
+    columns = [list(column) for column in zip(*rows)]
+    try:
+        update_cursor.execute(execute_sql, columns)
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise RuntimeError(
+            f"Batch update of ids {rows[0][0]}..{rows[-1][0]} failed, "
+            f"rolled back {uncommitted + len(rows)} uncommitted rows: {e}"
+        )
+    uncommitted += len(rows)
+    rows.clear()
+
+    if uncommitted >= COMMIT_EVERY_ROWS:
+        conn.commit()
+        return 0
+    return uncommitted
+
+
+def migrate_users(conn, update_cursor, enc_service: EncryptionService, dry_run: bool = False):
+    """Migrate user data to encrypted format"""
     print("\n=== Migrating Users ===")
 
-    # Fetch all users that need encryption (where email_blind_index is NULL)
-    cursor.execute("""
-        SELECT id, email, goal
+    update_cursor.execute("""
+        SELECT COUNT(*)
         FROM users
         WHERE email_blind_index IS NULL OR email_blind_index = ''
     """)
+    total = update_cursor.fetchone()[0]
+    print(f"Found {total} users to migrate")
 
-    users = cursor.fetchall()
-    print(f"Found {len(users)} users to migrate")
-
-    if len(users) == 0:
+    if total == 0:
         print("No users to migrate (all already encrypted or email_blind_index already set)")
         return
 
+    # Stream users that need encryption (where email_blind_index is NULL)
+    # through a server-side cursor instead of loading them all up front
+    # (WITH HOLD so the cursor survives the intermediate commits)
+    cursor = conn.cursor(name='mig_stream_users', withhold=True)
+    cursor.itersize = STREAM_BATCH_SIZE
+    cursor.execute("""
+        SELECT id, email, goal
+        FROM users
+        WHERE email_blind_index IS NULL OR email_blind_index = ''
+    """)
+
     migrated = 0
     errors = 0
-
-    for user in users:
-        user_id = user['id']
-        email = user['email']
-        goal = user['goal']
-
+    pending = []
+    queued_emails = []
+    uncommitted = 0
+
+    update_cursor.execute(USER_UPDATE_PREPARE)
+
+    def flush_users():
+        """Write the queued users, reporting them only once their batch has run"""
+        nonlocal migrated, uncommitted
+        uncommitted = flush_updates(conn, update_cursor, USER_UPDATE_EXECUTE, pending, uncommitted)
+        for user_id, email in queued_emails:
+            print(f"  ✓ User {user_id} migrated (email: {email})")
+        migrated += len(queued_emails)
+        queued_emails.clear()
+
+    # Plain tuple rows: no per-row dict is needed just to read three columns
+    for user_id, email, goal in cursor:
         try:
-            # Check if email is already encrypted (contains base64 chars and is long)
-            is_encrypted = len(email) > 50 and '/' in email or '+' in email or email.endswith('==')
-
-            if is_encrypted:
+            if looks_encrypted(email, enc_service):
                 print(f"  User {user_id}: Email appears already encrypted, skipping")
                 continue
 
@@ -153,24 +418,20 @@ def migrate_users(conn, enc_service: EncryptionService, dry_run: bool = False):
                 if goal:
                     print(f"    Goal: {goal[:30]}... -> {encrypted_goal[:40]}...")
             else:
-                # Update database
-                update_cursor = conn.cursor()
-                update_cursor.execute("""
-                    UPDATE users
-                    SET email = %s,
-                        email_blind_index = %s,
-                        goal = %s
-                    WHERE id = %s
-                """, (encrypted_email, email_blind_index, encrypted_goal, user_id))
-                update_cursor.close()
-
-                migrated += 1
-                print(f"  ✓ User {user_id} migrated (email: {email})")
+                # Queue the update for the next batch
+                pending.append((user_id, encrypted_email, email_blind_index, encrypted_goal))
+                queued_emails.append((user_id, email))
 
         except Exception as e:
             errors += 1
             print(f"  ✗ Error migrating user {user_id}: {e}")
 
+        # Outside the per-row try: a failed batch stops the migration
+        if len(pending) >= UPDATE_BATCH_SIZE:
+            flush_users()
+
+    flush_users()
+    update_cursor.execute("DEALLOCATE mig_user_upd")
     cursor.close()
 
     if not dry_run:
@@ -183,39 +444,47 @@ def migrate_users(conn, enc_service: EncryptionService, dry_run: bool = False):
         print(f"✗ {errors} errors occurred")
 
 
-def migrate_journal_entries(conn, enc_service: EncryptionService, dry_run: bool = False):
+def migrate_journal_entries(conn, update_cursor, enc_service: EncryptionService, dry_run: bool = False):
     """Migrate journal entry topics to encrypted format"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-
     print("\n=== Migrating Journal Entries ===")
 
-    # Fetch all journal entries
+    update_cursor.execute("SELECT COUNT(*) FROM journal_entries")
+    total = update_cursor.fetchone()[0]
+    print(f"Found {total} journal entries to check")
+
+    # Stream all journal entries through a server-side cursor
+    cursor = conn.cursor(name='mig_stream_entries', withhold=True)
+    cursor.itersize = STREAM_BATCH_SIZE
     cursor.execute("""
         SELECT id, topics
         FROM journal_entries
     """)
 
-    entries = cursor.fetchall()
-    print(f"Found {len(entries)} journal entries to check")
-
     migrated = 0
     errors = 0
     skipped = 0
+    pending = []
+    uncommitted = 0
 
-    for entry in entries:
-        entry_id = entry['id']
-        topics = entry['topics']
+    update_cursor.execute(ENTRY_UPDATE_PREPARE)
 
+    def flush_entries():
+        """Write the queued entries, counting them only once their batch has run"""
+        nonlocal migrated, uncommitted
+        written = len(pending)
+        uncommitted = flush_updates(conn, update_cursor, ENTRY_UPDATE_EXECUTE, pending, uncommitted)
+        if written:
+            migrated += written
+            print(f"  ✓ Migrated {migrated} entries...")
+
+    for entry_id, topics in cursor:
         try:
             # Skip empty topics
             if not topics:
                 skipped += 1
                 continue
 
-            # Check if topics is already encrypted (contains base64 chars and is long)
-            is_encrypted = len(topics) > 50 and ('/' in topics or '+' in topics or topics.endswith('=='))
-
-            if is_encrypted:
+            if looks_encrypted(topics, enc_service):
                 skipped += 1
                 continue
 
@@ -226,23 +495,19 @@ def migrate_journal_entries(conn, enc_service: EncryptionService, dry_run: bool
                 print(f"  [DRY RUN] Entry {entry_id}:")
                 print(f"    Topics: {topics[:30]}... -> {encrypted_topics[:40]}...")
             else:
-                # Update database
-                update_cursor = conn.cursor()
-                update_cursor.execute("""
-                    UPDATE journal_entries
-                    SET topics = %s
-                    WHERE id = %s
-                """, (encrypted_topics, entry_id))
-                update_cursor.close()
-
-                migrated += 1
-                if migrated % 100 == 0:
-                    print(f"  ✓ Migrated {migrated} entries...")
+                # Queue the update for the next batch
+                pending.append((entry_id, encrypted_topics))
 
         except Exception as e:
             errors += 1
             print(f"  ✗ Error migrating entry {entry_id}: {e}")
 
+        # Outside the per-row try: a failed batch stops the migration
+        if len(pending) >= UPDATE_BATCH_SIZE:
+            flush_entries()
+
+    flush_entries()
+    update_cursor.execute("DEALLOCATE mig_entry_upd")
     cursor.close()
 
     if not dry_run:
@@ -257,46 +522,114 @@ def migrate_journal_entries(conn, enc_service: EncryptionService, dry_run: bool
         print(f"✗ {errors} errors occurred")
 
 
-def verify_encryption(conn, enc_service: EncryptionService):
-    """Verify that encrypted data can be decrypted"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+def create_server_side_functions(cursor, encryption_key: bytes, blind_index_key: bytes) -> bool:
+    """Install the pg_temp encryption helpers and hand them the keys.
 
-    print("\n=== Verifying Encryption ===")
+    Returns False if the server can't run them.
+    """
+    cursor.execute("SELECT 1 FROM pg_language WHERE lanname = 'plpython3u'")
+    if cursor.fetchone() is None:
+        print("  plpython3u is not installed on the database server")
+        return False
 
-    # Check a few users
-    cursor.execute("SELECT id, email, email_blind_index, goal FROM users LIMIT 3")
-    users = cursor.fetchall()
+    cursor.execute("SAVEPOINT mig_in_db")
+    try:
+        cursor.execute(SERVER_SIDE_FUNCTIONS_SQL)
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT mig_in_db")
+        print(f"  Server-side encryption unavailable: {e}")
+        return False
 
-    for user in users:
-        try:
-            decrypted_email = enc_service.decrypt(user['email'])
-            print(f"  ✓ User {user['id']}: Email decrypts to {decrypted_email}")
+    # The only statement that carries key material. mig_set_keys reports a
+    # missing cryptography package by returning false instead of raising, so
+    # the keys don't end up in the server log as part of a failed statement
+    cursor.execute(
+        "SELECT pg_temp.mig_set_keys(%s, %s)",
+        (psycopg2.Binary(encryption_key), psycopg2.Binary(blind_index_key)),
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute("ROLLBACK TO SAVEPOINT mig_in_db")
+        print("  Server-side encryption unavailable: cryptography is not installed for plpython3u")
+        return False
 
-            # Verify blind index
-            regenerated_index = enc_service.generate_blind_index(decrypted_email)
-            if regenerated_index == user['email_blind_index']:
-                print(f"    ✓ Blind index matches")
-            else:
-                print(f"    ✗ Blind index mismatch!")
+    cursor.execute("RELEASE SAVEPOINT mig_in_db")
+    return True
 
-            if user['goal']:
-                decrypted_goal = enc_service.decrypt(user['goal'])
-                print(f"    ✓ Goal decrypts to: {decrypted_goal[:50]}...")
-        except Exception as e:
-            print(f"  ✗ Error verifying user {user['id']}: {e}")
 
-    # Check a few journal entries
-    cursor.execute("SELECT id, topics FROM journal_entries WHERE topics IS NOT NULL AND topics != '' LIMIT 3")
-    entries = cursor.fetchall()
+def migrate_in_database(conn, update_cursor, encryption_key: bytes, blind_index_key: bytes) -> bool:
+    """Encrypt users and journal entries with one set-based UPDATE per table.
 
-    for entry in entries:
-        try:
-            decrypted_topics = enc_service.decrypt(entry['topics'])
-            print(f"  ✓ Entry {entry['id']}: Topics decrypt to {decrypted_topics[:50]}...")
-        except Exception as e:
-            print(f"  ✗ Error verifying entry {entry['id']}: {e}")
+    Plaintext never leaves the database server, but both keys are sent to it
+    once, in a short setup call before the UPDATEs. Returns False, without
+    changing anything, when the server can't run the PL/Python helpers.
+    """
+    print("\n=== Migrating In Database ===")
+
+    if not create_server_side_functions(update_cursor, encryption_key, blind_index_key):
+        return False
+
+    update_cursor.execute(USER_IN_DB_UPDATE_SQL)
+    print(f"✓ Successfully migrated {update_cursor.rowcount} users")
+
+    update_cursor.execute(ENTRY_IN_DB_UPDATE_SQL)
+    print(f"✓ Successfully migrated {update_cursor.rowcount} journal entries")
+
+    conn.commit()
+    return True
+
+
+def verify_encryption(conn, enc_service: EncryptionService):
+    """Verify that encrypted data can be decrypted"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    print("\n=== Verifying Encryption ===")
 
+    # Sample a few users and journal entries in one round-trip
+    cursor.execute(VERIFY_SAMPLE_SQL)
+    samples = cursor.fetchall()
     cursor.close()
+
+    # Decrypt every sampled value in one batch; if any of them fails, decrypt
+    # row by row instead so each failure is reported against its row
+    values = [sample['ciphertext'] for sample in samples] + [sample['goal'] for sample in samples]
+    try:
+        decrypted = enc_service.decrypt_many(values)
+    except ValueError:
+        decrypted = None
+
+    def plaintext_at(i: int) -> str:
+        if decrypted is not None:
+            return decrypted[i]
+        return enc_service.decrypt(values[i])
+
+    goal_offset = len(samples)
+    for i, sample in enumerate(samples):
+        if sample['kind'] == 'user':
+            try:
+                decrypted_email = plaintext_at(i)
+                print(f"  ✓ User {sample['id']}: Email decrypts to {decrypted_email}")
+
+                # Verify blind index
+                # Compare as bytes: compare_digest rejects non-ASCII str
+                regenerated_index = enc_service.generate_blind_index(decrypted_email).encode('utf-8')
+                stored_index = (sample['email_blind_index'] or '').encode('utf-8')
+                if hmac.compare_digest(regenerated_index, stored_index):
+                    print(f"    ✓ Blind index matches")
+                else:
+                    print(f"    ✗ Blind index mismatch!")
+
+                if sample['goal']:
+                    decrypted_goal = plaintext_at(goal_offset + i)
+                    print(f"    ✓ Goal decrypts to: {decrypted_goal[:50]}...")
+            except Exception as e:
+                print(f"  ✗ Error verifying user {sample['id']}: {e}")
+        else:
+            try:
+                decrypted_topics = plaintext_at(i)
+                print(f"  ✓ Entry {sample['id']}: Topics decrypt to {decrypted_topics[:50]}...")
+            except Exception as e:
+                print(f"  ✗ Error verifying entry {sample['id']}: {e}")
+
     print("\n✓ Verification complete")
 
 
@@ -311,6 +644,8 @@ def main():
     if dry_run:
         print("\n⚠️  DRY RUN MODE - No changes will be made\n")
 
+    in_db = '--in-db' in sys.argv
+
     # Get encryption keys from environment
     encryption_key = os.getenv('ENCRYPTION_KEY')
     blind_index_key = os.getenv('BLIND_INDEX_KEY')
@@ -321,15 +656,16 @@ def main():
         sys.exit(1)
 
     # Convert keys to bytes
-    encryption_key_bytes = encryption_key.encode('utf-8')
-    blind_index_key_bytes = blind_index_key.encode('utf-8')
-
-    if len(encryption_key_bytes) != 32:
-        print(f"Error: ENCRYPTION_KEY must be exactly 32 bytes (got {len(encryption_key_bytes)})")
+    try:
+        encryption_key_bytes = parse_key(encryption_key)
+    except ValueError as e:
+        print(f"Error: Invalid ENCRYPTION_KEY: {e}")
         sys.exit(1)
 
-    if len(blind_index_key_bytes) != 32:
-        print(f"Error: BLIND_INDEX_KEY must be exactly 32 bytes (got {len(blind_index_key_bytes)})")
+    try:
+        blind_index_key_bytes = parse_key(blind_index_key)
+    except ValueError as e:
+        print(f"Error: Invalid BLIND_INDEX_KEY: {e}")
         sys.exit(1)
 
     print(f"Encryption key: {encryption_key[:8]}... (32 bytes)")
@@ -352,11 +688,25 @@ def main():
         sys.exit(1)
 
     try:
-        # Migrate users
-        migrate_users(conn, enc_service, dry_run)
+        # One write cursor is shared by both migrations
+        update_cursor = conn.cursor()
+
+        migrated_in_db = False
+        if in_db and not dry_run:
+            migrated_in_db = migrate_in_database(
+                conn, update_cursor, encryption_key_bytes, blind_index_key_bytes
+            )
+            if not migrated_in_db:
+                print("  Falling back to client-side migration")
+
+        if not migrated_in_db:
+            # Migrate users
+            migrate_users(conn, update_cursor, enc_service, dry_run)
+
+            # Migrate journal entries
+            migrate_journal_entries(conn, update_cursor, enc_service, dry_run)
 
-        # Migrate journal entries
-        migrate_journal_entries(conn, enc_service, dry_run)
+        update_cursor.close()
 
         # Verify encryption (only if not dry run)
         if not dry_run: